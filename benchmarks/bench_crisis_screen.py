@@ -0,0 +1,38 @@
+"""Benchmark the per-message overhead of the crisis pre-screen.
+
+Usage: python benchmarks/bench_crisis_screen.py
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from mindease.core.crisis import CrisisScreener
+
+SAMPLE_MESSAGES = [
+    "I am stressed about my exams next week and I can't focus on anything.",
+    "How do I manage my time better when I have three deadlines on Friday?",
+    "My roommate keeps me up at night and I'm exhausted in class.",
+    "Sometimes I feel like I want to die when my grades come back.",
+    "Can you share a breathing exercise for when I get anxious before presentations?",
+]
+
+
+def main():
+    random.seed(0)
+    screener = CrisisScreener()
+    # Pad messages to the API maximum so the benchmark covers the worst case
+    long_message = " ".join(random.choices(SAMPLE_MESSAGES[:3], k=200))[:5000]
+    cases = {"typical": SAMPLE_MESSAGES, "max length (5000 chars)": [long_message]}
+
+    for name, messages in cases.items():
+        runs = 20_000 // len(messages)
+        seconds = timeit.timeit(lambda: [screener.match(m) for m in messages], number=runs)
+        per_message_us = seconds / (runs * len(messages)) * 1e6
+        print(f"{name:>24}: {per_message_us:8.2f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Compare chat throughput and latency over REST and the WebSocket channel.
+
+Starts the API with uvicorn on a local port, backed by the stub LLM and a
+throwaway database, so it measures the transport, API and storage overhead
+of each channel rather than model latency. Each scenario runs `--turns`
+chat turns with `--concurrency` of them in flight at once, spread over
+that many conversations: REST over a pooled keep-alive HTTP client,
+WebSocket over a single multiplexed connection.
+
+Usage: python benchmarks/bench_ws_vs_rest.py [--turns 400] [--concurrency 1 4]
+
+Keep --concurrency at or below WS_MAX_IN_FLIGHT.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+_tmpdir = tempfile.mkdtemp(prefix="mindease-bench-")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ.setdefault("GROQ_API_KEY", "unused")
+os.environ.pop("WS_AUTH_TOKEN", None)
+
+import mindease.db.database as database
+
+database.DB_PATH = Path(_tmpdir) / "bench.db"
+
+import httpx
+import uvicorn
+import websockets
+
+from mindease.api.app import app
+
+HOST, PORT = "127.0.0.1", 8765
+MESSAGE = "I am stressed about my exams next week and I can't focus on anything."
+
+
+def report(name, turns, seconds, latencies_ms):
+    latencies_ms.sort()
+    p95 = latencies_ms[max(int(len(latencies_ms) * 0.95) - 1, 0)]
+    print(
+        f"{name:>28}: {turns / seconds:8.1f} msgs/s   "
+        f"p50 {statistics.median(latencies_ms):6.2f} ms   p95 {p95:6.2f} ms"
+    )
+
+
+async def run_workers(turns, concurrency, turn):
+    """Run `turns` calls of turn(worker) with `concurrency` workers, returning (seconds, latencies)."""
+    latencies = []
+    remaining = iter(range(turns))
+
+    async def worker(index):
+        for _ in remaining:
+            t0 = time.perf_counter()
+            await turn(index)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+async def bench_rest(turns, concurrency):
+    conversations = [str(uuid.uuid4()) for _ in range(concurrency)]
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}") as client:
+
+        async def turn(index):
+            response = await client.post(
+                "/v1/chat",
+                json={"content": MESSAGE, "user_id": "bench-rest", "conversation_id": conversations[index]},
+            )
+            response.raise_for_status()
+
+        return await run_workers(turns, concurrency, turn)
+
+
+async def bench_rest_stream(turns, concurrency):
+    conversations = [str(uuid.uuid4()) for _ in range(concurrency)]
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}") as client:
+
+        async def turn(index):
+            payload = {"content": MESSAGE, "user_id": "bench-stream", "conversation_id": conversations[index]}
+            async with client.stream("POST", "/v1/chat/stream", json=payload) as response:
+                async for _ in response.aiter_lines():
+                    pass
+
+        return await run_workers(turns, concurrency, turn)
+
+
+async def bench_ws(turns, concurrency):
+    conversations = [str(uuid.uuid4()) for _ in range(concurrency)]
+    async with websockets.connect(f"ws://{HOST}:{PORT}/v1/ws") as ws:
+        await ws.send(json.dumps({"type": "auth", "user_id": "bench-ws"}))
+        assert json.loads(await ws.recv())["type"] == "ready"
+
+        # One reader demultiplexes frames back to the waiting requests
+        pending = {}
+
+        async def reader():
+            async for raw in ws:
+                frame = json.loads(raw)
+                if frame["type"] in ("end", "error", "cancelled"):
+                    pending.pop(frame["request_id"]).set_result(frame)
+
+        reader_task = asyncio.create_task(reader())
+
+        async def turn(index):
+            request_id = uuid.uuid4().hex
+            pending[request_id] = asyncio.get_running_loop().create_future()
+            await ws.send(
+                json.dumps(
+                    {
+                        "type": "chat",
+                        "request_id": request_id,
+                        "content": MESSAGE,
+                        "conversation_id": conversations[index],
+                    }
+                )
+            )
+            frame = await pending[request_id]
+            if frame["type"] != "end":
+                raise RuntimeError(frame)
+
+        try:
+            return await run_workers(turns, concurrency, turn)
+        finally:
+            reader_task.cancel()
+
+
+SCENARIOS = {
+    "REST /v1/chat": bench_rest,
+    "REST /v1/chat/stream": bench_rest_stream,
+    "WebSocket /v1/ws": bench_ws,
+}
+
+
+async def run(turns, concurrency_levels):
+    # Warm up every path so table creation and first-request costs are not timed
+    for bench in SCENARIOS.values():
+        await bench(5, 1)
+
+    for concurrency in concurrency_levels:
+        print(f"\n{turns} turns, {concurrency} in flight")
+        for name, bench in SCENARIOS.items():
+            seconds, latencies = await bench(turns, concurrency)
+            report(name, turns, seconds, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        asyncio.run(run(args.turns, args.concurrency))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""Profile memory and CPU on the chat request path, and catch regressions.
+
+Replays a seeded workload through ChatService.chat and ConversationRepository
+against the offline stub LLM and a throwaway database, in separate passes on
+a fresh database each:
+
+1. timing: per-operation latency, with no instrumentation attached,
+   repeated --timing-runs times keeping each operation's best result
+2. memory: per-operation allocations with tracemalloc (peak bytes allocated
+   during the call and bytes still held after it), overall peak, and the
+   source lines that allocate the most
+3. cpu (with --profile-dir): a sampled stack profile written in collapsed
+   format, ready for flamegraph.pl or https://www.speedscope.app
+
+The results are compared with the committed baseline and the script exits
+with status 1 when an operation's allocations or latency regress by more
+than the tolerances, so it can gate CI. Allocations are deterministic;
+latency is noisy, so only the best of several runs is compared, which
+filters out runs slowed by other load on the machine. Latency still
+depends on the machine: refresh the baseline with --update-baseline on
+the machine that runs the check (and whenever a change is expected to
+move the numbers).
+
+Usage: python benchmarks/profile_request_path.py [--update-baseline] [--profile-dir DIR]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["STUB_LLM_TOKEN_DELAY"] = "0"
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+import mindease.db.database as database
+from mindease.db.repository import ConversationRepository
+from mindease.services.chat_service import ChatService
+
+BASELINE_PATH = Path(__file__).parent / "request_path_baseline.json"
+
+SAMPLE_MESSAGES = [
+    "I am stressed about my exams next week and I can't focus on anything.",
+    "How do I manage my time better when I have three deadlines on Friday?",
+    "My roommate keeps me up at night and I'm exhausted in class.",
+    "Can you share a breathing exercise for when I get anxious before presentations?",
+    "I failed my midterm and I don't know how to tell my parents.",
+    "I keep procrastinating on my thesis and feel guilty all the time.",
+]
+CRISIS_MESSAGE = "Sometimes I feel like I want to die when my grades come back."
+SEARCH_TERMS = ["exams", "deadlines", "breathing", "thesis", "parents"]
+
+
+def build_workload(seed, turns, users, max_turns_per_conversation):
+    """
+    Build a deterministic list of operations.
+
+    Every turn is a chat() call, continuing one of the user's conversations
+    or starting a new one, followed by a history page read. Every tenth
+    turn also lists the user's conversations and searches their messages.
+    """
+    rng = random.Random(seed)
+    conversations = {f"user-{i}": [] for i in range(users)}
+    ops = []
+    for turn in range(turns):
+        user_id = rng.choice(list(conversations))
+        open_conversations = [c for c in conversations[user_id] if c[1] < max_turns_per_conversation]
+        if open_conversations and rng.random() < 0.8:
+            conversation = rng.choice(open_conversations)
+        else:
+            conversation = [f"{user_id}-conv-{len(conversations[user_id])}", 0]
+            conversations[user_id].append(conversation)
+        conversation[1] += 1
+
+        if rng.random() < 0.02:
+            content = CRISIS_MESSAGE
+        else:
+            content = " ".join(rng.choices(SAMPLE_MESSAGES, k=rng.randint(1, 4)))
+
+        ops.append(("chat", user_id, conversation[0], content))
+        ops.append(("messages_page", user_id, conversation[0], None))
+        if turn % 10 == 9:
+            ops.append(("user_conversations", user_id, None, None))
+            ops.append(("search", user_id, None, rng.choice(SEARCH_TERMS)))
+    return ops
+
+
+def fresh_database(directory, name):
+    """Point the repository at a new, empty database."""
+    database.DB_PATH = Path(directory) / f"{name}.db"
+    database.init_db()
+
+
+def make_call(service, op):
+    """Return a zero-argument coroutine function performing one workload operation."""
+    kind, user_id, conversation_id, arg = op
+    repository = ConversationRepository
+
+    if kind == "chat":
+        return lambda: service.chat(arg, user_id, conversation_id)
+
+    async def call():
+        if kind == "messages_page":
+            return repository.get_messages_page(conversation_id, user_id, limit=50)
+        if kind == "user_conversations":
+            return repository.get_user_conversations(user_id)
+        return repository.search_messages(user_id, arg, limit=20)
+
+    return call
+
+
+async def replay(service, ops, measure):
+    """Run every operation, calling measure(kind, call) around each one."""
+    for op in ops:
+        await measure(op[0], make_call(service, op))
+
+
+async def warm_up(service):
+    """Exercise every code path once so imports and caches are not measured."""
+    warm_ops = build_workload(seed=-1, turns=10, users=1, max_turns_per_conversation=10)
+    await replay(service, [(k, "warmup", c and f"warmup-{c}", a) for k, _, c, a in warm_ops], lambda kind, call: call())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(len(values) * fraction) - 1, 0)]
+
+
+async def timing_pass(ops):
+    service = ChatService()
+    await warm_up(service)
+    latencies = defaultdict(list)
+
+    async def measure(kind, call):
+        started = time.perf_counter()
+        await call()
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    await replay(service, ops, measure)
+    return {
+        kind: {
+            "latency_p50_ms": round(statistics.median(values), 3),
+            "latency_p95_ms": round(percentile(values, 0.95), 3),
+        }
+        for kind, values in latencies.items()
+    }
+
+
+def best_of(runs):
+    """Keep each operation's lowest value of every latency statistic across timing runs."""
+    return {
+        kind: {metric: min(run[kind][metric] for run in runs) for metric in stats}
+        for kind, stats in runs[0].items()
+    }
+
+
+async def memory_pass(ops, top_lines):
+    service = ChatService()
+    await warm_up(service)
+    # Preallocated so recording a measurement allocates nothing that would be traced
+    peaks = array("q", bytes(8 * len(ops)))
+    retained = array("q", bytes(8 * len(ops)))
+    position = 0
+    overall_peak = 0
+
+    async def measure(kind, call):
+        nonlocal position, overall_peak
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await call()
+        after, peak = tracemalloc.get_traced_memory()
+        peaks[position] = peak - before - overhead_peak
+        retained[position] = after - before - overhead_retained
+        overall_peak = max(overall_peak, peak)
+        position += 1
+
+    async def noop():
+        pass
+
+    tracemalloc.start(25)
+    try:
+        # Calibrate what measuring itself allocates (the returned ints, the coroutine)
+        overhead_peak = overhead_retained = 0
+        for _ in range(3):
+            await measure("noop", noop)
+        overhead_peak, overhead_retained = peaks[position - 1], retained[position - 1]
+        position = 0
+
+        # Collect cyclic garbage around the snapshots so only live memory is compared
+        gc.collect()
+        start_snapshot = tracemalloc.take_snapshot()
+        # Read after the first snapshot, so it is not counted
+        started_at, _ = tracemalloc.get_traced_memory()
+        overall_peak = started_at
+        await replay(service, ops, measure)
+        gc.collect()
+        end_snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    growth = end_snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), "lineno")
+
+    by_kind = defaultdict(list)
+    for index, op in enumerate(ops):
+        by_kind[op[0]].append(index)
+    metrics = {
+        kind: {
+            "alloc_peak_bytes": round(statistics.mean(peaks[i] for i in indexes)),
+            "retained_bytes": round(statistics.mean(retained[i] for i in indexes)),
+        }
+        for kind, indexes in by_kind.items()
+    }
+    summary = {
+        "peak_bytes": overall_peak - started_at,
+        "retained_bytes": sum(stat.size_diff for stat in growth),
+    }
+    return metrics, summary, growth[:top_lines]
+
+
+class StackSampler:
+    """Samples the main thread's Python stack on a timer, counting collapsed stacks."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_qualname}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        # A shorter switch interval lets the sampler run while the main thread is busy
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval / 2)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+async def cpu_pass(ops, profile_dir, interval):
+    service = ChatService()
+    await warm_up(service)
+
+    with StackSampler(interval) as sampler:
+        await replay(service, ops, lambda kind, call: call())
+
+    path = Path(profile_dir) / "request_path.collapsed"
+    sampler.write_collapsed(path)
+
+    self_time = Counter()
+    for stack, count in sampler.stacks.items():
+        self_time[stack.rsplit(";", 1)[-1]] += count
+    return path, sum(sampler.stacks.values()), self_time.most_common(10)
+
+
+def compare(baseline, current, alloc_tolerance, latency_tolerance, min_alloc_slack, min_latency_slack_ms):
+    """Return a list of regression messages (empty when within tolerance)."""
+    regressions = []
+    for kind, base in baseline["operations"].items():
+        now = current["operations"].get(kind)
+        if now is None:
+            regressions.append(f"{kind}: missing from this run")
+            continue
+        for metric, base_value in base.items():
+            if metric.endswith("_bytes"):
+                limit = round(base_value + max(abs(base_value) * alloc_tolerance, min_alloc_slack))
+            else:
+                limit = round(base_value + max(base_value * latency_tolerance, min_latency_slack_ms), 3)
+            if now[metric] > limit:
+                regressions.append(f"{kind}.{metric}: {now[metric]} > {base_value} baseline (limit {limit})")
+
+    base_peak = baseline["summary"]["peak_bytes"]
+    limit = round(base_peak + max(base_peak * alloc_tolerance, min_alloc_slack))
+    if current["summary"]["peak_bytes"] > limit:
+        regressions.append(f"peak_bytes: {current['summary']['peak_bytes']} > {base_peak} baseline (limit {limit})")
+    return regressions
+
+
+def print_report(results, growth, cpu):
+    print(f"\n{'operation':>20} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'alloc peak':>12} {'retained':>10}")
+    for kind, m in results["operations"].items():
+        print(
+            f"{kind:>20} {results['calls'][kind]:>6} {m['latency_p50_ms']:>8.2f} {m['latency_p95_ms']:>8.2f} "
+            f"{m['alloc_peak_bytes']:>12,} {m['retained_bytes']:>10,}"
+        )
+    summary = results["summary"]
+    print(f"\nPeak traced memory over the run: {summary['peak_bytes']:,} bytes")
+    print(f"Memory still held after the run: {summary['retained_bytes']:,} bytes")
+
+    growth = [stat for stat in growth if stat.size_diff > 0]
+    print("\nLines holding the most new memory after the run:" + ("" if growth else " none"))
+    for stat in growth:
+        frame = stat.traceback[0]
+        print(f"  {stat.size_diff:>+10,} B {stat.count_diff:>+7} blocks  {frame.filename}:{frame.lineno}")
+
+    if cpu is not None:
+        path, samples, top = cpu
+        print(f"\nCPU samples: {samples}, flame profile written to {path}")
+        print("Top functions by self time:")
+        for name, count in top:
+            print(f"  {count / samples:>6.1%}  {name}")
+
+
+async def run(args):
+    ops = build_workload(args.seed, args.turns, args.users, args.max_turns_per_conversation)
+    with tempfile.TemporaryDirectory(prefix="mindease-profile-") as directory:
+        timing_runs = []
+        for index in range(args.timing_runs):
+            fresh_database(directory, f"timing-{index}")
+            timing_runs.append(await timing_pass(ops))
+        latency = best_of(timing_runs)
+        fresh_database(directory, "memory")
+        memory, summary, growth = await memory_pass(ops, args.top_lines)
+        cpu = None
+        if args.profile_dir:
+            Path(args.profile_dir).mkdir(parents=True, exist_ok=True)
+            fresh_database(directory, "cpu")
+            cpu = await cpu_pass(ops, args.profile_dir, args.sample_interval)
+
+    results = {
+        "workload": {
+            "seed": args.seed,
+            "turns": args.turns,
+            "users": args.users,
+            "max_turns_per_conversation": args.max_turns_per_conversation,
+            "timing_runs": args.timing_runs,
+        },
+        "python": platform.python_version(),
+        "calls": dict(Counter(op[0] for op in ops)),
+        "operations": {kind: {**latency[kind], **memory[kind]} for kind in latency},
+        "summary": summary,
+    }
+    print_report(results, growth, cpu)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--max-turns-per-conversation", type=int, default=30)
+    parser.add_argument("--timing-runs", type=int, default=5, help="Timing passes to take the best latency from")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.10, help="Allowed allocation growth (fraction)")
+    parser.add_argument("--latency-tolerance", type=float, default=0.50, help="Allowed latency growth (fraction)")
+    parser.add_argument("--min-alloc-slack", type=int, default=2048, help="Allowed allocation growth (bytes), at least")
+    parser.add_argument("--min-latency-slack-ms", type=float, default=0.5, help="Allowed latency growth (ms), at least")
+    parser.add_argument("--profile-dir", help="Also write a sampled CPU flame profile to this directory")
+    parser.add_argument("--sample-interval", type=float, default=0.001, help="CPU sampling interval (seconds)")
+    parser.add_argument("--top-lines", type=int, default=10)
+    args = parser.parse_args()
+
+    # Log at INFO like the API does, so log message formatting is measured, without the output
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    results = asyncio.run(run(args))
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        return 1
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["workload"] != results["workload"]:
+        print(f"\nWorkload differs from the baseline's {baseline['workload']}; results are not comparable")
+        return 1
+
+    if baseline["python"] != results["python"]:
+        print(f"\nWarning: baseline was recorded on Python {baseline['python']}; allocations may differ")
+
+    regressions = compare(
+        baseline,
+        results,
+        args.alloc_tolerance,
+        args.latency_tolerance,
+        args.min_alloc_slack,
+        args.min_latency_slack_ms,
+    )
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 
@@ -24,10 +25,55 @@ def run_chainlit():
     subprocess.run(["chainlit", "run", "src/mindease/ui/chainlit_app.py", "--port", "8001"])
 
 
+def run_export(argv: list[str]):
+    """Export conversation history as NDJSON."""
+    parser = argparse.ArgumentParser(prog="main.py export")
+    parser.add_argument("--user-id", help="Only export this user's history")
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    args = parser.parse_args(argv)
+
+    from mindease.db.database import init_db
+    from mindease.services.transfer_service import transfer_service
+
+    init_db()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        out.writelines(transfer_service.export_ndjson(args.user_id))
+    finally:
+        if args.output:
+            out.close()
+
+
+def run_import(argv: list[str]):
+    """Import conversation history from an NDJSON file."""
+    parser = argparse.ArgumentParser(prog="main.py import")
+    parser.add_argument("input", help="NDJSON file to import ('-' for stdin)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per batched insert")
+    args = parser.parse_args(argv)
+
+    from mindease.db.database import init_db
+    from mindease.services.transfer_service import transfer_service
+
+    init_db()
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        counts = transfer_service.import_ndjson(source, batch_size=args.batch_size)
+    except ValueError as e:
+        sys.exit(f"Import failed: {e}")
+    finally:
+        if args.input != "-":
+            source.close()
+    print(f"Imported {counts['conversations']} conversations and {counts['messages']} messages")
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "chainlit":
         print("Starting Chainlit interface on http://localhost:8001")
         run_chainlit()
+    elif len(sys.argv) > 1 and sys.argv[1] == "export":
+        run_export(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "import":
+        run_import(sys.argv[2:])
     else:
         print("Starting FastAPI server on http://localhost:8000")
         print("API Docs: http://localhost:8000/docs")
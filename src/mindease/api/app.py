@@ -1,10 +1,21 @@
+import hmac
+import json
 import logging
+import tempfile
 from contextlib import asynccontextmanager
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
+from mindease.api.compression import CompressionMiddleware
+from mindease.api.responses import FastJSONResponse
+from mindease.api.websocket import ChatConnection
+from mindease.config.settings import settings
 from mindease.services.chat_service import chat_service
+from mindease.services.transfer_service import transfer_service
 from mindease.schema.models import ChatMessage, ChatResponse
 from mindease.db.database import init_db
 
@@ -40,8 +51,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Compress larger responses for clients on slow links
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def bearer_token_matches(authorization: Optional[str], *tokens: Optional[str]) -> bool:
+    """Check an Authorization header for a bearer token equal to one of the configured tokens."""
+    scheme, _, presented = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    # Compare against every token so the timing does not reveal which one matched
+    matches = [hmac.compare_digest(presented, token) for token in tokens if token is not None]
+    return any(matches)
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Allow only requests carrying the admin token.
+
+    Raises:
+        HTTPException: If admin endpoints are disabled or the token is missing or wrong
+    """
+    if settings.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not bearer_token_matches(authorization, settings.ADMIN_TOKEN):
+        logger.warning("Rejected request with a missing or invalid admin token")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def require_client(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Allow only requests from trusted clients, carrying the API or admin token.
+
+    History is keyed only by user ID, which callers could otherwise supply
+    freely to read anyone's transcripts.
+
+    Raises:
+        HTTPException: If history reads are disabled or the token is missing or wrong
+    """
+    if settings.API_TOKEN is None and settings.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="History endpoints are disabled")
+    if not bearer_token_matches(authorization, settings.API_TOKEN, settings.ADMIN_TOKEN):
+        logger.warning("Rejected request with a missing or invalid API token")
+        raise HTTPException(status_code=401, detail="Invalid API token")
+
 
 @app.get("/health")
 async def health_check():
@@ -50,7 +116,7 @@ async def health_check():
 
 
 @app.post("/v1/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatMessage) -> ChatResponse:
+async def chat_endpoint(request: ChatMessage):
     """
     Chat endpoint for MindEase chatbot.
 
@@ -75,16 +141,18 @@ async def chat_endpoint(request: ChatMessage) -> ChatResponse:
             conversation_id=request.conversation_id,
         )
 
-        response_message = response.get("message")
-        conversation_id = response.get("conversation_id")
-        tokens_used = response.get("tokens_used")
-
-        logger.info(f"Successfully generated response for conversation {conversation_id}")
+        logger.info(f"Successfully generated response for conversation {response['conversation_id']}")
 
-        return ChatResponse(
-            message=response_message,
-            conversation_id=conversation_id,
-            tokens_used=tokens_used,
+        # The service result already has the ChatResponse fields, so it is
+        # serialized directly instead of being validated into the model again
+        return FastJSONResponse(
+            {
+                "message": response["message"],
+                "conversation_id": response["conversation_id"],
+                "tokens_used": response["tokens_used"],
+                "crisis_detected": response["crisis_detected"],
+                "prompt_version": response["prompt_version"],
+            }
         )
 
     except ValueError as e:
@@ -101,6 +169,147 @@ async def chat_endpoint(request: ChatMessage) -> ChatResponse:
         )
 
 
+@app.websocket("/v1/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket chat channel.
+
+    Clients authenticate once with an auth frame, then multiplex chat
+    requests (tagged with their own request_id) over the connection, with
+    responses streamed token by token. See ChatConnection for the protocol.
+    """
+    connection = ChatConnection(
+        websocket,
+        chat_service,
+        auth_token=settings.WS_AUTH_TOKEN,
+        max_in_flight=settings.WS_MAX_IN_FLIGHT,
+        send_queue_size=settings.WS_SEND_QUEUE_SIZE,
+    )
+    await connection.run()
+
+
+@app.post("/v1/chat/stream")
+async def chat_stream_endpoint(request: ChatMessage):
+    """
+    Streaming chat endpoint for MindEase chatbot.
+
+    Args:
+        request: ChatMessage containing user_id, message content and optional conversation_id
+
+    Returns:
+        Streaming NDJSON response of 'start', 'token' and 'end' events, or an
+        'error' event if generation fails after the stream has started
+    """
+    logger.info(
+        f"Received streaming chat request from user {request.user_id} (conversation: {request.conversation_id})"
+    )
+
+    async def events():
+        try:
+            async for event in chat_service.chat_stream(
+                user_message=request.content,
+                user_id=request.user_id,
+                conversation_id=request.conversation_id,
+            ):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except ValueError as e:
+            logger.error(f"Validation error: {str(e)}")
+            yield json.dumps(
+                {"type": "error", "detail": "Failed to process your message. Please try again."}
+            ) + "\n"
+
+    # Tokens must reach the client as they are generated, so ask the
+    # compression middleware (and proxies such as nginx) not to buffer
+    return StreamingResponse(
+        events(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/v1/conversations/{conversation_id}/messages", dependencies=[Depends(require_client)])
+async def get_conversation_messages(
+    request: Request,
+    conversation_id: str,
+    user_id: str,
+    before: Optional[int] = Query(None, description="Return messages older than this message ID"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of messages to return"),
+):
+    """
+    Get a page of conversation history, newest page first.
+
+    Responses carry an ETag derived from the conversation's message count and
+    latest message ID. A matching If-None-Match returns 304 without loading
+    any message bodies.
+
+    Args:
+        request: Incoming request (for the If-None-Match header)
+        conversation_id: ID of the conversation
+        user_id: User ID that owns the conversation
+        before: Optional message ID cursor from a previous page's 'next_before'
+        limit: Maximum number of messages to return
+
+    Returns:
+        Messages oldest first and the cursor for the previous page
+    """
+    version = chat_service.get_conversation_version(conversation_id, user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    message_count, last_message_id = version
+    etag = f'W/"{message_count}-{last_message_id or 0}-{before or 0}-{limit}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    page = chat_service.get_messages_page(conversation_id, user_id, before, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return FastJSONResponse({"conversation_id": conversation_id, **page}, headers=headers)
+
+
+@app.get("/v1/users/{user_id}/conversations", dependencies=[Depends(require_client)])
+async def get_user_conversations(user_id: str):
+    """
+    List a user's conversations, most recently updated first.
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        The user's conversations
+    """
+    return FastJSONResponse({"conversations": chat_service.get_user_conversations(user_id)})
+
+
+@app.get("/v1/users/{user_id}/search", dependencies=[Depends(require_client)])
+async def search_messages(
+    user_id: str,
+    q: str = Query(..., min_length=1, max_length=500, description="Words to search for"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results to return"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+):
+    """
+    Search a user's conversation history.
+
+    Args:
+        user_id: User ID whose messages are searched
+        q: Words to search for (all must match)
+        limit: Maximum number of results to return
+        offset: Number of results to skip
+
+    Returns:
+        Matching messages, best match first, with highlighted snippets
+
+    Raises:
+        HTTPException: If full-text search is unavailable
+    """
+    try:
+        results = chat_service.search_messages(user_id, q, limit, offset)
+    except RuntimeError as e:
+        logger.error(f"Search failed: {str(e)}")
+        raise HTTPException(status_code=503, detail="Search is currently unavailable")
+    return FastJSONResponse({"query": q, **results})
+
+
 @app.delete("/v1/conversations/{conversation_id}")
 async def clear_conversation(conversation_id: str, user_id: str):
     """
@@ -145,6 +354,79 @@ async def delete_conversation(conversation_id: str, user_id: str):
         )
 
 
+@app.get("/v1/conversations/flagged", dependencies=[Depends(require_admin)])
+async def get_flagged_conversations():
+    """
+    List conversations flagged for priority handling after crisis language was detected.
+
+    Returns:
+        Flagged conversations, oldest flag first
+    """
+    return FastJSONResponse({"conversations": chat_service.get_flagged_conversations()})
+
+
+@app.get("/v1/prompts")
+async def get_prompt_versions():
+    """
+    List loaded system prompt versions with token and latency stats per variant.
+
+    Returns:
+        Prompt versions with their traffic weight, prompt token count and
+        average tokens used and latency of the responses they produced
+    """
+    return FastJSONResponse({"versions": chat_service.get_prompt_versions()})
+
+
+@app.get("/v1/users/{user_id}/export", dependencies=[Depends(require_admin)])
+async def export_user_history(user_id: str):
+    """
+    Stream a user's full conversation history as NDJSON.
+
+    Args:
+        user_id: User ID whose history should be exported
+
+    Returns:
+        Streaming NDJSON response with one conversation or message record per line
+    """
+    logger.info(f"Exporting conversation history for user {user_id}")
+    return StreamingResponse(
+        transfer_service.export_ndjson_async(user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{user_id}.ndjson"'},
+    )
+
+
+@app.post("/v1/import", dependencies=[Depends(require_admin)])
+async def import_history(request: Request):
+    """
+    Bulk import conversation history from an NDJSON request body.
+
+    The body is spooled to a temporary file as it arrives so large uploads
+    never sit fully in memory, then loaded with batched inserts.
+
+    Args:
+        request: Request whose body is NDJSON in the export format
+
+    Returns:
+        Counts of imported conversations and messages
+
+    Raises:
+        HTTPException: If the body contains invalid records
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        try:
+            counts = await run_in_threadpool(transfer_service.import_ndjson, spool)
+        except ValueError as e:
+            logger.error(f"Import failed: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return {"status": "success", **counts}
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API info."""
@@ -153,6 +435,11 @@ async def root():
         "version": "0.1.0",
         "endpoints": {
             "chat": "/v1/chat",
+            "chat_stream": "/v1/chat/stream",
+            "chat_websocket": "/v1/ws",
+            "search": "/v1/users/{user_id}/search",
+            "export": "/v1/users/{user_id}/export",
+            "import": "/v1/import",
             "health": "/health",
             "docs": "/docs",
             "openapi": "/openapi.json",
@@ -0,0 +1,257 @@
+import asyncio
+import hmac
+import json
+import logging
+from contextlib import aclosing
+from typing import Optional, Dict, Any, Set, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from mindease.services.chat_service import ChatService
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client has to send its auth frame after connecting
+AUTH_TIMEOUT = 10.0
+
+# Same limits as the REST ChatMessage schema
+MAX_USER_ID_LENGTH = 255
+MAX_CONTENT_LENGTH = 5000
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class ChatConnection:
+    """
+    One WebSocket chat connection, multiplexing several generations at once.
+
+    Protocol (JSON text frames):
+        client -> server:
+            {"type": "auth", "user_id": ..., "token": ...}  (first frame, once)
+            {"type": "chat", "request_id": ..., "content": ..., "conversation_id": ...}
+            {"type": "cancel", "request_id": ...}
+        server -> client:
+            {"type": "ready"}
+            {"type": "start" | "token" | "end", "request_id": ..., ...}  (as in /v1/chat/stream)
+            {"type": "cancelled", "request_id": ...}
+            {"type": "error", "request_id": ..., "detail": ...}
+
+    Backpressure: streamed frames need a send credit, and there are only
+    `send_queue_size` of them. Once that many frames are waiting for a slow
+    client, generations pause (and stop pulling from the LLM) until the
+    client catches up. Control frames skip the limit so cancellations and
+    errors are never held back; instead, a client that lets more than
+    `send_queue_size` of them pile up is not reading its replies, and is
+    disconnected with 1008.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        chat_service: ChatService,
+        auth_token: Optional[str] = None,
+        max_in_flight: int = 4,
+        send_queue_size: int = 64,
+    ):
+        """
+        Initialize the connection.
+
+        Args:
+            websocket: Accepted-to-be WebSocket
+            chat_service: Chat service generating the responses
+            auth_token: Shared token clients must present, or None to accept any client
+            max_in_flight: Maximum concurrent generations on this connection
+            send_queue_size: Maximum streamed (and, separately, control) frames
+                buffered for a slow client
+        """
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self.auth_token = auth_token
+        self.max_in_flight = max_in_flight
+        self.user_id: Optional[str] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.busy_conversations: Set[str] = set()
+        self.outbox: asyncio.Queue[Tuple[Dict[str, Any], bool]] = asyncio.Queue()
+        self.send_queue_size = send_queue_size
+        self.send_credits = asyncio.Semaphore(send_queue_size)
+        self.unsent_control = 0
+        self.closing = False
+
+    async def run(self) -> None:
+        """Serve the connection until the client disconnects."""
+        await self.websocket.accept()
+        if not await self._authenticate():
+            await self.websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        logger.info(f"WebSocket connection opened for user {self.user_id}")
+        sender = asyncio.create_task(self._sender())
+        self._send_control({"type": "ready"})
+        overflowed = False
+        try:
+            while True:
+                frame = await self._receive_frame()
+                if frame is not None:
+                    self._dispatch(frame)
+                # Every control frame answers a client frame, so checking here
+                # bounds how many can pile up
+                if self.unsent_control > self.send_queue_size:
+                    logger.warning(f"Closing WebSocket for user {self.user_id}: replies are not being read")
+                    overflowed = True
+                    break
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.closing = True
+            for task in list(self.tasks.values()):
+                task.cancel()
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            logger.info(f"WebSocket connection closed for user {self.user_id}")
+        if overflowed:
+            await self.websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+
+    async def _authenticate(self) -> bool:
+        """Read and check the auth frame, which must be the first frame sent."""
+        try:
+            text = await asyncio.wait_for(self._receive_text(), timeout=AUTH_TIMEOUT)
+            frame = json.loads(text) if text is not None else None
+        except (asyncio.TimeoutError, ValueError, WebSocketDisconnect):
+            return False
+
+        if not isinstance(frame, dict) or frame.get("type") != "auth":
+            return False
+        user_id = frame.get("user_id")
+        if not isinstance(user_id, str) or not 0 < len(user_id) <= MAX_USER_ID_LENGTH:
+            return False
+        if self.auth_token is not None and not hmac.compare_digest(
+            str(frame.get("token", "")), self.auth_token
+        ):
+            logger.warning(f"WebSocket authentication failed for user {user_id}")
+            return False
+
+        self.user_id = user_id
+        return True
+
+    async def _receive_text(self) -> Optional[str]:
+        """
+        Receive one frame's text, or None for a binary frame.
+
+        Raises:
+            WebSocketDisconnect: If the client disconnected
+        """
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE), message.get("reason"))
+        return message.get("text")
+
+    async def _receive_frame(self) -> Optional[Dict[str, Any]]:
+        """Receive one JSON object frame, reporting malformed (or binary) ones to the client."""
+        text = await self._receive_text()
+        try:
+            frame = json.loads(text) if text is not None else None
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict):
+            self._send_control({"type": "error", "request_id": None, "detail": "Frames must be JSON objects"})
+            return None
+        return frame
+
+    def _dispatch(self, frame: Dict[str, Any]) -> None:
+        """Handle a client frame. Never blocks, so cancels are always read promptly."""
+        frame_type = frame.get("type")
+        request_id = frame.get("request_id")
+        if not isinstance(request_id, str) or not 0 < len(request_id) <= MAX_REQUEST_ID_LENGTH:
+            self._send_control({"type": "error", "request_id": None, "detail": "Invalid request_id"})
+            return
+
+        if frame_type == "cancel":
+            task = self.tasks.get(request_id)
+            if task is not None:
+                task.cancel()
+            return
+
+        if frame_type != "chat":
+            self._send_control({"type": "error", "request_id": request_id, "detail": "Unknown frame type"})
+            return
+
+        content = frame.get("content")
+        conversation_id = frame.get("conversation_id")
+        if not isinstance(content, str) or not 0 < len(content) <= MAX_CONTENT_LENGTH:
+            error = "content must be 1 to 5000 characters"
+        elif conversation_id is not None and not isinstance(conversation_id, str):
+            error = "conversation_id must be a string"
+        elif request_id in self.tasks:
+            error = "request_id is already in flight"
+        elif len(self.tasks) >= self.max_in_flight:
+            error = "Too many requests in flight on this connection"
+        elif conversation_id in self.busy_conversations:
+            error = "A response is already being generated for this conversation"
+        else:
+            error = None
+        if error is not None:
+            self._send_control({"type": "error", "request_id": request_id, "detail": error})
+            return
+
+        task = asyncio.create_task(self._generate(request_id, content, conversation_id))
+        self.tasks[request_id] = task
+        if conversation_id is not None:
+            self.busy_conversations.add(conversation_id)
+        task.add_done_callback(lambda t: self._finish(request_id, conversation_id, t))
+
+    async def _generate(self, request_id: str, content: str, conversation_id: Optional[str]) -> None:
+        """Stream one response to the client."""
+        # aclosing() closes the upstream LLM stream as soon as we are cancelled,
+        # even when the cancel lands while waiting for a send credit
+        events = self.chat_service.chat_stream(content, self.user_id, conversation_id)
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    await self.send_credits.acquire()
+                    if event["type"] == "end":
+                        # Free the slot before the client can see the end frame and
+                        # send its follow-up, or the follow-up could be rejected
+                        self._release(request_id, conversation_id, asyncio.current_task())
+                    self.outbox.put_nowait(({**event, "request_id": request_id}, True))
+        except ValueError as e:
+            logger.error(f"Validation error: {str(e)}")
+            self._send_control(
+                {
+                    "type": "error",
+                    "request_id": request_id,
+                    "detail": "Failed to process your message. Please try again.",
+                }
+            )
+
+    def _release(self, request_id: str, conversation_id: Optional[str], task: asyncio.Task) -> bool:
+        """Free a generation's request ID and conversation, if still held by `task`."""
+        if self.tasks.get(request_id) is not task:
+            return False
+        del self.tasks[request_id]
+        if conversation_id is not None:
+            self.busy_conversations.discard(conversation_id)
+        return True
+
+    def _finish(self, request_id: str, conversation_id: Optional[str], task: asyncio.Task) -> None:
+        """Clean up after a generation ends, acknowledging cancellations."""
+        released = self._release(request_id, conversation_id, task)
+        if released and task.cancelled() and not self.closing:
+            logger.info(f"Cancelled generation {request_id} for user {self.user_id}")
+            self._send_control({"type": "cancelled", "request_id": request_id})
+
+    def _send_control(self, frame: Dict[str, Any]) -> None:
+        """Queue a frame that bypasses backpressure (see run() for its limit)."""
+        self.unsent_control += 1
+        self.outbox.put_nowait((frame, False))
+
+    async def _sender(self) -> None:
+        """Write queued frames to the socket, returning send credits as frames go out."""
+        while True:
+            frame, credited = await self.outbox.get()
+            try:
+                await self.websocket.send_text(json.dumps(frame, ensure_ascii=False))
+            finally:
+                if credited:
+                    self.send_credits.release()
+                else:
+                    self.unsent_control -= 1
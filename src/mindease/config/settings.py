@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -16,5 +18,38 @@ class Settings(BaseSettings):
     TEMPERATURE: float = 0.7
     DEBUG: bool = False
 
+    # "groq" or "stub" (offline deterministic replies for benchmarks and profiling)
+    LLM_PROVIDER: Literal["groq", "stub"] = "groq"
+    STUB_LLM_TOKEN_DELAY: float = 0.0
+
+    # WebSocket chat: optional shared token required at connection setup,
+    # concurrent generations per connection, and frames buffered per connection
+    WS_AUTH_TOKEN: Optional[str] = None
+    WS_MAX_IN_FLIGHT: int = 4
+    WS_SEND_QUEUE_SIZE: int = 64
+
+    # Token required (as "Authorization: Bearer <token>") by the admin
+    # endpoints: flagged conversations, export and import. They are disabled
+    # when unset.
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Token trusted clients (such as the Chainlit UI) present, as a bearer
+    # token, to read or search stored history, which is keyed only by user ID.
+    # The admin token is accepted too. These reads are disabled when neither is set.
+    API_TOKEN: Optional[str] = None
+
+    # Responses smaller than this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # Crisis pre-screening: "respond" replies with crisis resources without
+    # calling the LLM, "flag" only marks the conversation for priority handling.
+    CRISIS_MODE: Literal["respond", "flag"] = "respond"
+    CRISIS_PHRASES_FILE: Optional[str] = None
+    CRISIS_RELOAD_INTERVAL: float = 5.0
+
+    # Directory of versioned system prompt templates (built-in prompt if unset)
+    PROMPTS_DIR: Optional[str] = None
+    PROMPTS_RELOAD_INTERVAL: float = 5.0
+
 
 settings = Settings()
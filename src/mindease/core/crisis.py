@@ -0,0 +1,160 @@
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Iterable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Phrases used when no phrase file is configured. Matching is case-insensitive,
+# on word boundaries, and tolerant of extra whitespace and missing apostrophes.
+DEFAULT_CRISIS_PHRASES = (
+    "kill myself",
+    "killing myself",
+    "end my life",
+    "ending my life",
+    "take my own life",
+    "want to die",
+    "wanna die",
+    "better off dead",
+    "suicide",
+    "suicidal",
+    "self harm",
+    "self-harm",
+    "hurt myself",
+    "hurting myself",
+    "cut myself",
+    "cutting myself",
+    "no reason to live",
+    "don't want to live",
+    "don't want to be alive",
+    "can't go on",
+    "overdose",
+)
+
+
+def _trie_pattern(trie: Dict[str, Any]) -> str:
+    """Render a character trie as a regex so shared prefixes are matched once."""
+    end = "" in trie
+    branches = []
+    for char, child in sorted((k, v) for k, v in trie.items() if k):
+        if char == " ":
+            atom = r"\s+"
+        elif char == "'":
+            atom = "['’]?"
+        else:
+            atom = re.escape(char)
+        branches.append(atom + _trie_pattern(child))
+
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if end:
+        # A phrase may end here, but only at a word boundary
+        body = "(?:" + body + r"|\b)"
+    return body
+
+
+def compile_phrases(phrases: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile crisis phrases into a single trie-shaped pattern.
+
+    Args:
+        phrases: Phrases to match
+
+    Returns:
+        Compiled pattern, or None if there are no phrases
+    """
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            continue
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    if not trie:
+        return None
+    # Callers lowercase the text instead of using re.IGNORECASE, which is
+    # noticeably slower on long messages.
+    return re.compile(r"\b" + _trie_pattern(trie) + r"\b")
+
+
+class CrisisScreener:
+    """Local pre-screen for crisis language, run before any LLM call."""
+
+    def __init__(
+        self,
+        phrases_file: Optional[str] = None,
+        reload_interval: float = 5.0,
+    ):
+        """
+        Initialize the screener.
+
+        Args:
+            phrases_file: Optional file with one phrase per line ('#' starts a comment).
+                          The built-in phrase list is used if not provided.
+            reload_interval: Minimum seconds between checks of the phrase file for changes
+        """
+        self.phrases_file = Path(phrases_file) if phrases_file else None
+        self.reload_interval = reload_interval
+        self._pattern = compile_phrases(DEFAULT_CRISIS_PHRASES)
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._maybe_reload()
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Check a message for crisis language.
+
+        Args:
+            text: Message to screen
+
+        Returns:
+            The matched phrase (lowercased), or None if nothing matched
+        """
+        self._maybe_reload()
+        pattern = self._pattern
+        if pattern is None:
+            return None
+        found = pattern.search(text.lower())
+        return found.group(0) if found else None
+
+    def _maybe_reload(self) -> None:
+        """Recompile the pattern if the phrase file changed since the last check."""
+        if self.phrases_file is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            self._next_check = now + self.reload_interval
+            try:
+                mtime = self.phrases_file.stat().st_mtime
+            except OSError as e:
+                logger.warning(f"Cannot read crisis phrase file {self.phrases_file}: {e}")
+                return
+            if mtime == self._mtime:
+                return
+            # Remember the mtime even if loading fails so a broken file is
+            # reported once rather than on every check.
+            self._mtime = mtime
+
+            lines = self.phrases_file.read_text(encoding="utf-8").splitlines()
+            pattern = compile_phrases(line.split("#", 1)[0] for line in lines)
+            if pattern is None:
+                # Never let an empty file switch screening off
+                raise ValueError("no phrases found")
+            # Swap in the new pattern with a single assignment so concurrent
+            # readers always see either the old or the new one.
+            self._pattern = pattern
+            logger.info(f"Loaded crisis phrases from {self.phrases_file}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to reload crisis phrases, keeping previous phrases: {e}")
+        finally:
+            self._lock.release()
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
+
+from mindease.core.prompts import MINDEASE_SYSTEM_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Name used for the built-in system prompt when no templates are loaded
+DEFAULT_PROMPT_NAME = "default"
+
+# Template file suffixes picked up from the prompts directory
+TEMPLATE_SUFFIXES = (".md", ".txt")
+
+# Optional file in the prompts directory mapping prompt names to traffic weights
+VARIANTS_FILE = "variants.json"
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without a model tokenizer.
+
+    Counts words and punctuation marks; long words are split roughly the way
+    BPE tokenizers do, at about four characters per token.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate number of tokens
+    """
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_RE.findall(text))
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A precompiled system prompt version.
+
+    `name` is the template's file stem; `version` adds a short hash of the
+    text (e.g. "v1@3fa2c1") so editing a template in place records its
+    responses under a new version rather than mixing them with the old text.
+    """
+
+    name: str
+    version: str
+    text: str
+    token_count: int
+    system_message: Dict[str, str] = field(repr=False)
+
+    @classmethod
+    def compile(cls, name: str, text: str) -> "PromptTemplate":
+        """Build a template with its version, API message and token count computed up front."""
+        text = text.strip() + "\n"
+        content_hash = hashlib.blake2b(text.encode(), digest_size=3).hexdigest()
+        return cls(
+            name=name,
+            version=f"{name}@{content_hash}",
+            text=text,
+            token_count=estimate_tokens(text),
+            system_message={"role": "system", "content": text},
+        )
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """Immutable set of loaded templates and their variant weights."""
+
+    # Templates by name
+    templates: Dict[str, PromptTemplate]
+    # Cumulative (upper bound, name) pairs for weighted assignment
+    buckets: Tuple[Tuple[int, str], ...]
+    total_weight: int
+
+
+class PromptRegistry:
+    """Registry of versioned system prompts with per-user variant assignment."""
+
+    def __init__(self, prompts_dir: Optional[str] = None, reload_interval: float = 5.0):
+        """
+        Initialize the registry.
+
+        Args:
+            prompts_dir: Optional directory of prompt templates, one per file
+                         (the file stem is the name). An optional
+                         variants.json maps names to integer traffic weights;
+                         without it every prompt gets equal traffic. The
+                         built-in prompt is used if no templates are found.
+            reload_interval: Minimum seconds between checks of the directory for changes
+        """
+        self.prompts_dir = Path(prompts_dir) if prompts_dir else None
+        self.reload_interval = reload_interval
+        self._snapshot = self._build_snapshot(
+            {DEFAULT_PROMPT_NAME: MINDEASE_SYSTEM_PROMPT}, None
+        )
+        self._signature: Optional[Tuple] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._maybe_reload()
+
+    def get(self, name: str) -> Optional[PromptTemplate]:
+        """Get a loaded prompt by name, or None if it does not exist."""
+        self._maybe_reload()
+        return self._snapshot.templates.get(name)
+
+    def select(self, user_id: str) -> PromptTemplate:
+        """
+        Pick the prompt variant for a user.
+
+        The same user always gets the same variant for a given set of weights.
+
+        Args:
+            user_id: User identifier
+
+        Returns:
+            The assigned prompt template
+        """
+        self._maybe_reload()
+        snapshot = self._snapshot
+        digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+        point = int.from_bytes(digest, "big") % snapshot.total_weight
+        for upper, name in snapshot.buckets:
+            if point < upper:
+                return snapshot.templates[name]
+        return snapshot.templates[snapshot.buckets[-1][1]]
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """
+        List loaded prompt versions.
+
+        Returns:
+            List of dictionaries with 'name', 'version', 'token_count' and 'weight' keys
+        """
+        self._maybe_reload()
+        snapshot = self._snapshot
+        weights: Dict[str, int] = {}
+        lower = 0
+        for upper, name in snapshot.buckets:
+            weights[name] = upper - lower
+            lower = upper
+        return [
+            {
+                "name": template.name,
+                "version": template.version,
+                "token_count": template.token_count,
+                "weight": weights.get(template.name, 0),
+            }
+            for template in snapshot.templates.values()
+        ]
+
+    def _maybe_reload(self) -> None:
+        """Reload templates if any file in the prompts directory changed."""
+        if self.prompts_dir is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            self._next_check = now + self.reload_interval
+            try:
+                files = sorted(p for p in self.prompts_dir.iterdir() if p.is_file())
+                signature = tuple((p.name, p.stat().st_mtime_ns) for p in files)
+            except OSError as e:
+                logger.warning(f"Cannot read prompts directory {self.prompts_dir}: {e}")
+                return
+            if signature == self._signature:
+                return
+            # Remember the signature even if loading fails so a broken file is
+            # reported once rather than on every check.
+            self._signature = signature
+
+            texts = {
+                p.stem: p.read_text(encoding="utf-8")
+                for p in files
+                if p.suffix in TEMPLATE_SUFFIXES
+            }
+            weights = None
+            variants_path = self.prompts_dir / VARIANTS_FILE
+            if variants_path.exists():
+                weights = json.loads(variants_path.read_text(encoding="utf-8"))
+
+            if not texts:
+                texts = {DEFAULT_PROMPT_NAME: MINDEASE_SYSTEM_PROMPT}
+            # Swap in the new snapshot with a single assignment so concurrent
+            # requests always see a consistent set of templates and weights.
+            self._snapshot = self._build_snapshot(texts, weights)
+            logger.info(
+                f"Loaded prompt versions {[t.version for t in self._snapshot.templates.values()]} "
+                f"from {self.prompts_dir}"
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to reload prompts, keeping previous versions: {e}")
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _build_snapshot(
+        texts: Dict[str, str], weights: Optional[Dict[str, Any]]
+    ) -> _Snapshot:
+        """Compile templates and resolve their traffic weights."""
+        templates = {
+            name: PromptTemplate.compile(name, text)
+            for name, text in sorted(texts.items())
+        }
+        if weights is None:
+            weights = {name: 1 for name in templates}
+        elif not isinstance(weights, dict):
+            raise ValueError(f"{VARIANTS_FILE} must map prompt names to weights")
+
+        unknown = set(weights) - set(templates)
+        if unknown:
+            raise ValueError(f"{VARIANTS_FILE} references unknown prompts {sorted(unknown)}")
+
+        buckets = []
+        total = 0
+        for name in templates:
+            weight = weights.get(name, 0)
+            # bool is an int subclass, and floats would be silently truncated
+            if not isinstance(weight, int) or isinstance(weight, bool) or weight < 0:
+                raise ValueError(f"Weight for {name!r} must be a non-negative integer, got {weight!r}")
+            if weight:
+                total += weight
+                buckets.append((total, name))
+        if total == 0:
+            raise ValueError("At least one prompt version needs a positive weight")
+
+        return _Snapshot(templates=templates, buckets=tuple(buckets), total_weight=total)
@@ -61,3 +61,13 @@ and conversational as possible (except you need to provide unavoidably long resp
 
 Remember: Your goal is to make students feel seen, supported, and empowered to take care of themselves while pursuing their academic goals.
 """
+
+CRISIS_RESPONSE = """I'm really glad you told me, and I'm so sorry you're carrying this much pain right now. You deserve support from a real person immediately.
+
+**Please reach out right now:**
+- If you are in immediate danger, call your local emergency number (e.g. 112 or 911).
+- Call or text a crisis line — in the US, dial or text **988** (Suicide & Crisis Lifeline); elsewhere, find a local line at https://findahelpline.com.
+- Talk to someone you trust — a friend, family member, or your school counselor.
+
+You don't have to go through this alone. I'm still here to talk with you too. 💙
+"""
@@ -11,6 +11,88 @@ logger = logging.getLogger(__name__)
 DB_PATH = Path(__file__).parent.parent.parent.parent / "data" / "mindease.db"
 
 
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> None:
+    """Add a column to an existing table if it is missing."""
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column {table}.{column}")
+
+
+# Keeps the full-text index in sync with new messages
+SEARCH_INSERT_TRIGGER_SQL = """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content, user_token) VALUES (new.id, new.content, new.user_token);
+    END
+"""
+
+# Indexes all messages with an ID above the given one in a single pass
+SEARCH_INDEX_SINCE_SQL = """
+    INSERT INTO messages_fts(rowid, content, user_token)
+    SELECT id, content, user_token FROM messages WHERE id > ?
+"""
+
+
+def search_index_exists(cursor: sqlite3.Cursor) -> bool:
+    """Check whether the full-text search index has been created."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'")
+    return cursor.fetchone() is not None
+
+
+def _init_search_index(cursor: sqlite3.Cursor) -> None:
+    """
+    Create the FTS5 full-text index over message content.
+
+    The index stores no copy of the text (it reads it from the messages table)
+    and is kept in sync by triggers, so clearing or deleting conversations
+    removes their messages from it too. The user ID is indexed through the
+    hex-encoded user_token column, one exact token per user, so searches are
+    scoped to a user inside the index rather than by filtering every match
+    afterwards. Existing messages are indexed the first time the index is
+    created.
+    """
+    exists = search_index_exists(cursor)
+
+    try:
+        cursor.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content,
+                user_token,
+                content='messages',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+            """
+        )
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text search unavailable, SQLite lacks FTS5: {e}")
+        return
+
+    cursor.execute(SEARCH_INSERT_TRIGGER_SQL)
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content, user_token)
+            VALUES ('delete', old.id, old.content, old.user_token);
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content, user_id ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content, user_token)
+            VALUES ('delete', old.id, old.content, old.user_token);
+            INSERT INTO messages_fts(rowid, content, user_token) VALUES (new.id, new.content, new.user_token);
+        END
+        """
+    )
+
+    if not exists:
+        cursor.execute(SEARCH_INDEX_SINCE_SQL, (0,))
+        logger.info("Built full-text search index over existing messages")
+
+
 def init_db(reset: bool = False) -> None:
     """
     Initialize SQLite database with required tables.
@@ -25,12 +107,17 @@ def init_db(reset: bool = False) -> None:
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
+    # WAL lets readers (e.g. a slow export) run alongside chat writes; the
+    # setting is stored in the database file
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # Check environment variable for reset flag
     reset = reset or os.getenv("DB_RESET", "").lower() == "true"
 
     # Drop tables if reset is True
     if reset:
         logger.info("Resetting database tables...")
+        cursor.execute("DROP TABLE IF EXISTS messages_fts")
         cursor.execute("DROP TABLE IF EXISTS messages")
         cursor.execute("DROP TABLE IF EXISTS conversations")
 
@@ -42,7 +129,8 @@ def init_db(reset: bool = False) -> None:
             conversation_id TEXT NOT NULL UNIQUE,
             user_id TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            crisis_flagged_at TIMESTAMP
         )
         """
     )
@@ -57,13 +145,22 @@ def init_db(reset: bool = False) -> None:
             role TEXT NOT NULL CHECK(role IN ('user', 'assistant')),
             content TEXT NOT NULL,
             tokens_used INTEGER,
+            prompt_version TEXT,
+            latency_ms INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_token TEXT GENERATED ALWAYS AS (hex(user_id)) VIRTUAL,
             FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id),
             FOREIGN KEY (user_id) REFERENCES conversations(user_id)
         )
         """
     )
 
+    # Columns added after the initial schema
+    _ensure_column(cursor, "conversations", "crisis_flagged_at", "TIMESTAMP")
+    _ensure_column(cursor, "messages", "prompt_version", "TEXT")
+    _ensure_column(cursor, "messages", "latency_ms", "INTEGER")
+    _ensure_column(cursor, "messages", "user_token", "TEXT GENERATED ALWAYS AS (hex(user_id)) VIRTUAL")
+
     # Create indexes for faster queries
     cursor.execute(
         "CREATE INDEX IF NOT EXISTS idx_user_id ON conversations(user_id)"
@@ -74,6 +171,14 @@ def init_db(reset: bool = False) -> None:
     cursor.execute(
         "CREATE INDEX IF NOT EXISTS idx_user_messages ON messages(user_id)"
     )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_crisis_flagged ON conversations(crisis_flagged_at)
+        WHERE crisis_flagged_at IS NOT NULL
+        """
+    )
+
+    _init_search_index(cursor)
 
     conn.commit()
     conn.close()
@@ -1,11 +1,36 @@
 import logging
+import re
+import sqlite3
 import uuid
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 
-from mindease.db.database import get_db_connection
+from mindease.db.database import (
+    SEARCH_INDEX_SINCE_SQL,
+    SEARCH_INSERT_TRIGGER_SQL,
+    get_db_connection,
+    search_index_exists,
+)
 
 logger = logging.getLogger(__name__)
 
+_SEARCH_TERM_RE = re.compile(r"\w+")
+
+
+def _fts_query(query: str, user_id: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all of its words in one user's messages.
+
+    Words are quoted so user input can never be parsed as FTS5 syntax; the
+    porter tokenizer already matches other forms of each word ("breathing"
+    finds "breathe"). Messages are indexed under the hex-encoded user ID
+    (the user_token column), so the user filter is a single exact token.
+    """
+    terms = _SEARCH_TERM_RE.findall(query)
+    if not terms:
+        return None
+    content = " ".join(f'"{term}"' for term in terms)
+    return f'user_token : "{user_id.encode().hex()}" AND content : ({content})'
+
 
 class ConversationRepository:
     """Repository for managing conversations and messages."""
@@ -69,6 +94,8 @@ class ConversationRepository:
         role: str,
         content: str,
         tokens_used: Optional[int] = None,
+        prompt_version: Optional[str] = None,
+        latency_ms: Optional[int] = None,
     ) -> None:
         """
         Add a message to a conversation.
@@ -79,15 +106,18 @@ class ConversationRepository:
             role: Message role ('user' or 'assistant')
             content: Message content
             tokens_used: Optional token count for the message
+            prompt_version: Optional system prompt version used to generate the message
+            latency_ms: Optional LLM response time in milliseconds
         """
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                INSERT INTO messages (conversation_id, user_id, role, content, tokens_used)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO messages
+                    (conversation_id, user_id, role, content, tokens_used, prompt_version, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                (conversation_id, user_id, role, content, tokens_used),
+                (conversation_id, user_id, role, content, tokens_used, prompt_version, latency_ms),
             )
             conn.commit()
 
@@ -119,6 +149,172 @@ class ConversationRepository:
 
         return [{"role": row["role"], "content": row["content"]} for row in rows]
 
+    @staticmethod
+    def get_conversation_version(
+        conversation_id: str, user_id: str
+    ) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Get a cheap fingerprint of a conversation's messages.
+
+        Only the messages index is read, so this stays fast however long the
+        messages are. Message IDs only grow, so any insert or delete changes
+        the result.
+
+        Args:
+            conversation_id: Conversation ID
+            user_id: User ID
+
+        Returns:
+            Tuple of (message count, latest message ID or None), or None if the
+            conversation is not found
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM messages WHERE conversation_id = c.conversation_id),
+                    (SELECT MAX(id) FROM messages WHERE conversation_id = c.conversation_id)
+                FROM conversations c
+                WHERE c.conversation_id = ? AND c.user_id = ?
+                """,
+                (conversation_id, user_id),
+            )
+            row = cursor.fetchone()
+
+        return (row[0], row[1]) if row else None
+
+    @staticmethod
+    def get_messages_page(
+        conversation_id: str,
+        user_id: str,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a page of messages in a conversation, walking backwards from the newest.
+
+        Args:
+            conversation_id: Conversation ID
+            user_id: User ID
+            before_id: Only return messages with an ID lower than this (newest page if None)
+            limit: Maximum number of messages to return
+
+        Returns:
+            Dictionary with 'messages' (oldest first, each with 'id', 'role', 'content'
+            and 'created_at' keys) and 'next_before' (the before_id for the previous
+            page, None if there is none), or None if the conversation is not found
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT 1 FROM conversations
+                WHERE conversation_id = ? AND user_id = ?
+                """,
+                (conversation_id, user_id),
+            )
+            if not cursor.fetchone():
+                return None
+
+            before = "AND id < ?" if before_id is not None else ""
+            params = (conversation_id, user_id) + ((before_id,) if before_id is not None else ())
+            # Fetch one extra row to know whether an earlier page exists
+            cursor.execute(
+                f"""
+                SELECT id, role, content, created_at FROM messages
+                WHERE conversation_id = ? AND user_id = ? {before}
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (*params, limit + 1),
+            )
+            rows = cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "messages": [
+                {
+                    "id": row["id"],
+                    "role": row["role"],
+                    "content": row["content"],
+                    "created_at": row["created_at"],
+                }
+                for row in reversed(rows)
+            ],
+            "next_before": rows[-1]["id"] if has_more else None,
+        }
+
+    @staticmethod
+    def search_messages(
+        user_id: str, query: str, limit: int = 20, offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Full-text search over a user's messages, best matches first.
+
+        Args:
+            user_id: User ID whose messages are searched
+            query: Free-text search query
+            limit: Maximum number of results to return
+            offset: Number of results to skip
+
+        Returns:
+            Dictionary with 'results' (each with 'message_id', 'conversation_id',
+            'role', 'snippet', 'created_at' and 'rank' keys, lower rank is better)
+            and 'has_more'
+
+        Raises:
+            RuntimeError: If full-text search is not available in this SQLite build
+        """
+        match = _fts_query(query, user_id)
+        if match is None:
+            return {"results": [], "has_more": False}
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Rank all matches first, then build snippets only for the
+                # page being returned. One extra row shows whether there is
+                # another page.
+                cursor.execute(
+                    """
+                    WITH top AS MATERIALIZED (
+                        SELECT rowid AS id, bm25(messages_fts, 1.0, 0.0) AS rank
+                        FROM messages_fts
+                        WHERE messages_fts MATCH ?
+                        ORDER BY rank
+                        LIMIT ? OFFSET ?
+                    )
+                    SELECT m.id, m.conversation_id, m.role, m.created_at, top.rank,
+                           snippet(messages_fts, 0, '**', '**', '…', 16) AS snippet
+                    FROM top
+                    JOIN messages_fts ON messages_fts.rowid = top.id
+                    JOIN messages m ON m.id = top.id
+                    WHERE messages_fts MATCH ? AND m.user_id = ?
+                    ORDER BY top.rank
+                    """,
+                    (match, limit + 1, offset, match, user_id),
+                )
+            except sqlite3.OperationalError as e:
+                raise RuntimeError(f"Full-text search is not available: {e}") from e
+            rows = cursor.fetchall()
+
+        return {
+            "results": [
+                {
+                    "message_id": row["id"],
+                    "conversation_id": row["conversation_id"],
+                    "role": row["role"],
+                    "snippet": row["snippet"],
+                    "created_at": row["created_at"],
+                    "rank": row["rank"],
+                }
+                for row in rows[:limit]
+            ],
+            "has_more": len(rows) > limit,
+        }
+
     @staticmethod
     def get_user_conversations(user_id: str) -> List[Dict[str, Any]]:
         """
@@ -235,3 +431,322 @@ class ConversationRepository:
 
         logger.info(f"Deleted conversation {conversation_id} for user {user_id}")
         return True
+
+    @staticmethod
+    def flag_conversation(conversation_id: str, user_id: str) -> None:
+        """
+        Mark a conversation for priority handling after crisis language was detected.
+
+        The first flag time is kept if the conversation is flagged again.
+
+        Args:
+            conversation_id: Conversation ID
+            user_id: User ID
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE conversations
+                SET crisis_flagged_at = COALESCE(crisis_flagged_at, CURRENT_TIMESTAMP)
+                WHERE conversation_id = ? AND user_id = ?
+                """,
+                (conversation_id, user_id),
+            )
+            conn.commit()
+
+        logger.warning(f"Flagged conversation {conversation_id} for user {user_id} for priority handling")
+
+    @staticmethod
+    def get_flagged_conversations() -> List[Dict[str, Any]]:
+        """
+        Get all conversations flagged for priority handling.
+
+        Returns:
+            List of conversation dictionaries, oldest flag first
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT conversation_id, user_id, crisis_flagged_at FROM conversations
+                WHERE crisis_flagged_at IS NOT NULL
+                ORDER BY crisis_flagged_at ASC
+                """
+            )
+            rows = cursor.fetchall()
+
+        return [
+            {
+                "conversation_id": row["conversation_id"],
+                "user_id": row["user_id"],
+                "crisis_flagged_at": row["crisis_flagged_at"],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def get_prompt_version_stats() -> List[Dict[str, Any]]:
+        """
+        Aggregate token usage and latency of assistant messages per prompt version.
+
+        Returns:
+            List of dictionaries with 'prompt_version', 'responses', 'avg_tokens_used'
+            and 'avg_latency_ms' keys
+        """
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT prompt_version, COUNT(*) AS responses,
+                       AVG(tokens_used) AS avg_tokens_used, AVG(latency_ms) AS avg_latency_ms
+                FROM messages
+                WHERE role = 'assistant' AND prompt_version IS NOT NULL
+                GROUP BY prompt_version
+                ORDER BY prompt_version
+                """
+            )
+            rows = cursor.fetchall()
+
+        return [
+            {
+                "prompt_version": row["prompt_version"],
+                "responses": row["responses"],
+                "avg_tokens_used": row["avg_tokens_used"],
+                "avg_latency_ms": row["avg_latency_ms"],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def get_export_batch(
+        record_type: str,
+        user_id: Optional[str] = None,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> Dict[str, Any]:
+        """
+        Get one batch of conversation or message records for export.
+
+        Batches are keyed on the row ID and each one uses its own short-lived
+        connection, so an export never holds a read transaction (or a
+        connection) open between batches, however slowly it is consumed.
+
+        Args:
+            record_type: 'conversation' or 'message'
+            user_id: Optional user ID to restrict the export to (all users if None)
+            after_id: Row ID to continue after (0 for the first batch)
+            limit: Maximum number of records in the batch
+
+        Returns:
+            Dictionary with 'records' (tagged with a 'type' of 'conversation' or
+            'message') and 'next_after', the after_id of the next batch, or None
+            if this was the last one
+        """
+        if record_type == "conversation":
+            columns = "id, conversation_id, user_id, created_at, updated_at, crisis_flagged_at"
+            table = "conversations"
+        else:
+            columns = (
+                "id, conversation_id, user_id, role, content, tokens_used, "
+                "prompt_version, latency_ms, created_at"
+            )
+            table = "messages"
+        user_clause = "AND user_id = ?" if user_id is not None else ""
+        params = (after_id, user_id, limit) if user_id is not None else (after_id, limit)
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT {columns} FROM {table}
+                WHERE id > ? {user_clause}
+                ORDER BY id ASC
+                LIMIT ?
+                """,
+                params,
+            )
+            rows = cursor.fetchall()
+
+        records = []
+        for row in rows:
+            record = {"type": record_type, **dict(row)}
+            del record["id"]
+            records.append(record)
+
+        return {
+            "records": records,
+            "next_after": rows[-1]["id"] if len(rows) == limit else None,
+        }
+
+    @staticmethod
+    def bulk_import(
+        records: Iterable[Tuple[int, Dict[str, Any]]],
+        batch_size: int = 5000,
+        commit_every: int = 5000,
+    ) -> Dict[str, int]:
+        """
+        Bulk load conversation and message records.
+
+        Records are buffered into batches and written with executemany, and
+        committed every `commit_every` rows. Each transaction holds the write
+        lock, blocking live chat writes until it commits, so keep
+        `commit_every` small when importing into a database that is serving
+        traffic. Conversations that already exist are left as is;
+        messages are always appended, so importing the same file twice
+        duplicates its messages. A record for a conversation that belongs
+        to another user is rejected. Rows committed before a failure are kept.
+
+        Imported messages are added to the full-text index in one pass per
+        transaction instead of row by row through the insert trigger, which
+        is several times faster. The trigger is dropped and restored inside
+        the same transaction, so other connections never see it missing.
+
+        Args:
+            records: Iterable of (line number, record) pairs, records in the
+                format produced by get_export_batch
+            batch_size: Number of rows per executemany call
+            commit_every: Number of rows written between commits
+
+        Returns:
+            Dictionary with 'conversations' and 'messages' counts of rows inserted
+
+        Raises:
+            ValueError: If a record has an unknown type, is missing fields,
+                names another user's conversation or violates a table constraint
+        """
+        conversations: List[tuple] = []
+        messages: List[tuple] = []
+        counts = {"conversations": 0, "messages": 0}
+        uncommitted = 0
+        last_conversation: Optional[tuple] = None
+        # Owners of the conversations buffered in `conversations`, not yet written
+        pending_owners: Dict[str, str] = {}
+
+        with get_db_connection() as conn:
+            # Safe in WAL mode (see init_db): a crash may lose the last
+            # commits but cannot corrupt the database
+            conn.execute("PRAGMA synchronous = NORMAL")
+            cursor = conn.cursor()
+            index_search = search_index_exists(cursor)
+
+            def begin() -> int:
+                cursor.execute("BEGIN IMMEDIATE")
+                if not index_search:
+                    return 0
+                cursor.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+                return cursor.fetchone()[0]
+
+            def commit(indexed_up_to: int) -> None:
+                if index_search:
+                    cursor.execute(SEARCH_INDEX_SINCE_SQL, (indexed_up_to,))
+                    cursor.execute(SEARCH_INSERT_TRIGGER_SQL)
+                conn.commit()
+
+            def flush() -> int:
+                written = 0
+                if conversations:
+                    cursor.executemany(
+                        """
+                        INSERT OR IGNORE INTO conversations
+                            (conversation_id, user_id, created_at, updated_at, crisis_flagged_at)
+                        VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?)
+                        """,
+                        conversations,
+                    )
+                    counts["conversations"] += cursor.rowcount
+                    written += len(conversations)
+                    conversations.clear()
+                    pending_owners.clear()
+                if messages:
+                    cursor.executemany(
+                        """
+                        INSERT INTO messages
+                            (conversation_id, user_id, role, content, tokens_used,
+                             prompt_version, latency_ms, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                        """,
+                        messages,
+                    )
+                    counts["messages"] += cursor.rowcount
+                    written += len(messages)
+                    messages.clear()
+                return written
+
+            def owner_of(conversation_id: str) -> Optional[str]:
+                if conversation_id in pending_owners:
+                    return pending_owners[conversation_id]
+                cursor.execute(
+                    "SELECT user_id FROM conversations WHERE conversation_id = ?",
+                    (conversation_id,),
+                )
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+            try:
+                indexed_up_to = begin()
+                for line_number, record in records:
+                    try:
+                        record_type = record["type"]
+                        if record_type not in ("conversation", "message"):
+                            raise ValueError(f"unknown record type {record_type!r}")
+                        owner = (record["conversation_id"], record["user_id"])
+                        if owner != last_conversation:
+                            existing_owner = owner_of(owner[0])
+                            if existing_owner is None:
+                                # Conversations must exist before their messages
+                                # can be read back, so create any that are missing.
+                                if record_type == "conversation":
+                                    timestamps = (
+                                        record.get("created_at"),
+                                        record.get("updated_at"),
+                                        record.get("crisis_flagged_at"),
+                                    )
+                                else:
+                                    timestamps = (None, None, None)
+                                conversations.append((*owner, *timestamps))
+                                pending_owners[owner[0]] = owner[1]
+                            elif existing_owner != owner[1]:
+                                raise ValueError(
+                                    f"conversation {owner[0]!r} belongs to another user"
+                                )
+                            last_conversation = owner
+                        if record_type == "message":
+                            messages.append(
+                                (
+                                    record["conversation_id"],
+                                    record["user_id"],
+                                    record["role"],
+                                    record["content"],
+                                    record.get("tokens_used"),
+                                    record.get("prompt_version"),
+                                    record.get("latency_ms"),
+                                    record.get("created_at"),
+                                )
+                            )
+                    except KeyError as e:
+                        raise ValueError(f"Record on line {line_number} is missing field {e}") from e
+                    except ValueError as e:
+                        raise ValueError(f"Invalid record on line {line_number}: {e}") from e
+
+                    if len(conversations) + len(messages) >= batch_size:
+                        uncommitted += flush()
+                        if uncommitted >= commit_every:
+                            commit(indexed_up_to)
+                            indexed_up_to = begin()
+                            uncommitted = 0
+
+                flush()
+                commit(indexed_up_to)
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                raise ValueError(f"Record violates a constraint: {e}") from e
+            except Exception:
+                conn.rollback()
+                raise
+
+        logger.info(
+            f"Imported {counts['conversations']} conversations and {counts['messages']} messages"
+        )
+        return counts
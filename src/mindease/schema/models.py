@@ -30,6 +30,12 @@ class ChatResponse(BaseModel):
         ..., description="Conversation ID for tracking multi-turn chat"
     )
     tokens_used: int = Field(..., description="Number of tokens used in response")
+    crisis_detected: bool = Field(
+        False, description="Whether the message was flagged for crisis language"
+    )
+    prompt_version: Optional[str] = Field(
+        None, description="System prompt version used to generate the response"
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -1,11 +1,15 @@
 import logging
-from typing import Optional, Dict, List, Any
+import time
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple
 
-from groq import Groq
+from groq import AsyncGroq
 
 from mindease.config.settings import settings
-from mindease.core.prompts import MINDEASE_SYSTEM_PROMPT
+from mindease.core.crisis import CrisisScreener
+from mindease.core.prompt_registry import PromptRegistry, PromptTemplate
+from mindease.core.prompts import CRISIS_RESPONSE
 from mindease.db.repository import ConversationRepository
+from mindease.services.stub_llm import StubLLMClient
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +18,24 @@ class ChatService:
     """Service for managing chatbot interactions with Groq API."""
 
     def __init__(self):
-        """Initialize the chat service with Groq client."""
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        """Initialize the chat service with Groq client (or the offline stub)."""
+        if settings.LLM_PROVIDER == "stub":
+            self.client = StubLLMClient(token_delay=settings.STUB_LLM_TOKEN_DELAY)
+        else:
+            self.client = AsyncGroq(api_key=settings.GROQ_API_KEY)
         self.model = settings.GROQ_MODEL
         self.max_tokens = settings.MAX_TOKENS
         self.temperature = settings.TEMPERATURE
         self.repository = ConversationRepository()
+        self.crisis_mode = settings.CRISIS_MODE
+        self.crisis_screener = CrisisScreener(
+            phrases_file=settings.CRISIS_PHRASES_FILE,
+            reload_interval=settings.CRISIS_RELOAD_INTERVAL,
+        )
+        self.prompt_registry = PromptRegistry(
+            prompts_dir=settings.PROMPTS_DIR,
+            reload_interval=settings.PROMPTS_RELOAD_INTERVAL,
+        )
 
     async def chat(
         self,
@@ -30,72 +46,213 @@ class ChatService:
         """
         Send a message to the chatbot and get a response.
 
+        Messages are screened locally for crisis language first. On a match the
+        conversation is flagged for priority handling and, in "respond" mode,
+        crisis resources are returned without calling the LLM.
+
         Args:
             user_message: The user's message
             user_id: Unique user identifier
             conversation_id: Optional conversation ID for multi-turn chat
 
         Returns:
-            Dictionary with keys: 'message', 'conversation_id', and 'tokens_used'
+            Dictionary with keys: 'message', 'conversation_id', 'tokens_used',
+            'crisis_detected' and 'prompt_version'
 
         Raises:
             ValueError: If API call fails
         """
         try:
-            # Get or create conversation
-            if conversation_id is None:
-                conv_id = self.repository.create_conversation(user_id)
-            else:
-                # Verify conversation exists and belongs to user
-                if not self.repository.conversation_exists(conversation_id, user_id):
-                    conv_id = self.repository.create_conversation(user_id, conversation_id)
-                else:
-                    conv_id = conversation_id
+            conv_id, crisis_detected = self._start_turn(user_message, user_id, conversation_id)
+            if crisis_detected and self.crisis_mode == "respond":
+                return self._crisis_reply(conv_id, user_id, user_message)
 
-            # Get conversation history from database
-            history = self.repository.get_conversation_history(conv_id, user_id)
-
-            # Build messages for API call
-            messages = history.copy()
-            messages.append({"role": "user", "content": user_message})
+            prompt, messages = self._build_messages(conv_id, user_id, user_message)
 
             # Call Groq API
-            response = self.client.chat.completions.create(
+            started = time.perf_counter()
+            response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": MINDEASE_SYSTEM_PROMPT},
-                    *messages,
-                ],
+                messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
             )
+            latency_ms = round((time.perf_counter() - started) * 1000)
 
             # Extract response
             assistant_message = response.choices[0].message.content
             tokens_used = response.usage.total_tokens
 
-            # Store messages in database
-            self.repository.add_message(
-                conv_id, user_id, "user", user_message
+            self._store_turn(
+                conv_id, user_id, user_message, assistant_message, tokens_used, prompt.version, latency_ms
             )
-            self.repository.add_message(
-                conv_id, user_id, "assistant", assistant_message, tokens_used
+
+            return {
+                "message": assistant_message,
+                "conversation_id": conv_id,
+                "tokens_used": tokens_used,
+                "crisis_detected": crisis_detected,
+                "prompt_version": prompt.version,
+            }
+
+        except Exception as e:
+            logger.error(f"Error in chat service: {str(e)}")
+            raise ValueError(f"Failed to generate response: {str(e)}")
+
+    async def chat_stream(
+        self,
+        user_message: str,
+        user_id: str,
+        conversation_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a message to the chatbot and stream the response as it is generated.
+
+        Messages are only stored once the response has been fully generated.
+        Cancelling the consuming task closes the upstream LLM stream, so no
+        further tokens are generated or billed, and stores nothing.
+
+        Args:
+            user_message: The user's message
+            user_id: Unique user identifier
+            conversation_id: Optional conversation ID for multi-turn chat
+
+        Yields:
+            Event dictionaries: one 'start' event with the 'conversation_id', 'token'
+            events with a 'content' chunk, and a final 'end' event with the same
+            keys as the chat() result except 'message'
+
+        Raises:
+            ValueError: If API call fails
+        """
+        try:
+            conv_id, crisis_detected = self._start_turn(user_message, user_id, conversation_id)
+            yield {"type": "start", "conversation_id": conv_id}
+
+            if crisis_detected and self.crisis_mode == "respond":
+                reply = self._crisis_reply(conv_id, user_id, user_message)
+                yield {"type": "token", "content": reply.pop("message")}
+                yield {"type": "end", **reply}
+                return
+
+            prompt, messages = self._build_messages(conv_id, user_id, user_message)
+
+            started = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True,
             )
+            chunks: List[str] = []
+            tokens_used = 0
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        chunks.append(chunk.choices[0].delta.content)
+                        yield {"type": "token", "content": chunk.choices[0].delta.content}
+                    # Groq reports usage on the final chunk
+                    usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None)
+                    if usage is not None:
+                        tokens_used = usage.total_tokens
+            finally:
+                # Aborts the upstream request if we stopped early (e.g. cancelled)
+                await stream.close()
+            latency_ms = round((time.perf_counter() - started) * 1000)
 
-            logger.info(
-                f"Chat response generated for conversation {conv_id}, user {user_id}. Tokens: {tokens_used}"
+            self._store_turn(
+                conv_id, user_id, user_message, "".join(chunks), tokens_used, prompt.version, latency_ms
             )
 
-            return {
-                "message": assistant_message,
+            yield {
+                "type": "end",
                 "conversation_id": conv_id,
                 "tokens_used": tokens_used,
+                "crisis_detected": crisis_detected,
+                "prompt_version": prompt.version,
             }
 
         except Exception as e:
             logger.error(f"Error in chat service: {str(e)}")
             raise ValueError(f"Failed to generate response: {str(e)}")
 
+    def _start_turn(
+        self, user_message: str, user_id: str, conversation_id: Optional[str]
+    ) -> Tuple[str, bool]:
+        """Resolve the conversation for a turn and pre-screen the message for crisis language."""
+        # Get or create conversation
+        if conversation_id is None:
+            conv_id = self.repository.create_conversation(user_id)
+        else:
+            # Verify conversation exists and belongs to user
+            if not self.repository.conversation_exists(conversation_id, user_id):
+                conv_id = self.repository.create_conversation(user_id, conversation_id)
+            else:
+                conv_id = conversation_id
+
+        # Pre-screen for crisis language before spending an LLM round trip
+        if self.crisis_screener.match(user_message) is None:
+            return conv_id, False
+
+        self.repository.flag_conversation(conv_id, user_id)
+        return conv_id, True
+
+    def _crisis_reply(self, conv_id: str, user_id: str, user_message: str) -> Dict[str, Any]:
+        """Store and return the crisis resources reply without calling the LLM."""
+        self.repository.add_message(conv_id, user_id, "user", user_message)
+        self.repository.add_message(conv_id, user_id, "assistant", CRISIS_RESPONSE, 0)
+        logger.warning(f"Returned crisis resources for conversation {conv_id}, user {user_id}")
+        return {
+            "message": CRISIS_RESPONSE,
+            "conversation_id": conv_id,
+            "tokens_used": 0,
+            "crisis_detected": True,
+            "prompt_version": None,
+        }
+
+    def _build_messages(
+        self, conv_id: str, user_id: str, user_message: str
+    ) -> Tuple[PromptTemplate, List[Dict[str, str]]]:
+        """Build the API messages from the user's prompt variant and conversation history."""
+        # Pick the system prompt variant assigned to this user
+        prompt = self.prompt_registry.select(user_id)
+
+        # Get conversation history from database
+        history = self.repository.get_conversation_history(conv_id, user_id)
+
+        return prompt, [
+            prompt.system_message,
+            *history,
+            {"role": "user", "content": user_message},
+        ]
+
+    def _store_turn(
+        self,
+        conv_id: str,
+        user_id: str,
+        user_message: str,
+        assistant_message: str,
+        tokens_used: int,
+        prompt_version: str,
+        latency_ms: int,
+    ) -> None:
+        """Store a completed user/assistant exchange."""
+        self.repository.add_message(conv_id, user_id, "user", user_message)
+        self.repository.add_message(
+            conv_id,
+            user_id,
+            "assistant",
+            assistant_message,
+            tokens_used,
+            prompt_version=prompt_version,
+            latency_ms=latency_ms,
+        )
+
+        logger.info(
+            f"Chat response generated for conversation {conv_id}, user {user_id}. Tokens: {tokens_used}"
+        )
+
     def clear_conversation(self, conversation_id: str, user_id: str) -> bool:
         """Clear conversation history."""
         return self.repository.clear_conversation(conversation_id, user_id)
@@ -108,6 +265,50 @@ class ChatService:
         """Get all conversations for a user."""
         return self.repository.get_user_conversations(user_id)
 
+    def search_messages(
+        self, user_id: str, query: str, limit: int = 20, offset: int = 0
+    ) -> Dict[str, Any]:
+        """Full-text search over a user's messages, best matches first."""
+        return self.repository.search_messages(user_id, query, limit, offset)
+
+    def get_conversation_version(
+        self, conversation_id: str, user_id: str
+    ) -> Optional[Tuple[int, Optional[int]]]:
+        """Get a conversation's message count and latest message ID, or None if not found."""
+        return self.repository.get_conversation_version(conversation_id, user_id)
+
+    def get_messages_page(
+        self,
+        conversation_id: str,
+        user_id: str,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> Optional[Dict[str, Any]]:
+        """Get a page of conversation messages, newest page first."""
+        return self.repository.get_messages_page(conversation_id, user_id, before_id, limit)
+
+    def get_prompt_versions(self) -> List[Dict[str, Any]]:
+        """Get loaded prompt versions with their traffic weights and usage stats."""
+        stats = {
+            row["prompt_version"]: row for row in self.repository.get_prompt_version_stats()
+        }
+        versions = []
+        for version in self.prompt_registry.list_versions():
+            usage = stats.get(version["version"], {})
+            versions.append(
+                {
+                    **version,
+                    "responses": usage.get("responses", 0),
+                    "avg_tokens_used": usage.get("avg_tokens_used"),
+                    "avg_latency_ms": usage.get("avg_latency_ms"),
+                }
+            )
+        return versions
+
+    def get_flagged_conversations(self) -> List[Dict[str, Any]]:
+        """Get conversations flagged for priority handling."""
+        return self.repository.get_flagged_conversations()
+
 
 # Global chat service instance
 chat_service = ChatService()
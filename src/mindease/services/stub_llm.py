@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from typing import Dict, List, Any, Iterator
+
+# Vocabulary the stub builds its replies from
+_WORDS = (
+    "I hear you and that sounds really challenging right now . It is completely normal "
+    "to feel this way when exams pile up . What if we broke the work into smaller steps "
+    "and started with one thing you can do today ? Taking a short break to breathe can help too ."
+).split()
+
+
+class _StubStream:
+    """Async iterator over stub completion chunks, shaped like Groq's AsyncStream."""
+
+    def __init__(self, chunks: Iterator[SimpleNamespace], token_delay: float):
+        self._chunks = chunks
+        self._token_delay = token_delay
+
+    def __aiter__(self) -> "_StubStream":
+        return self
+
+    async def __anext__(self) -> SimpleNamespace:
+        if self._token_delay:
+            await asyncio.sleep(self._token_delay)
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self) -> None:
+        self._chunks = iter(())
+
+
+class _StubCompletions:
+    """Stand-in for `client.chat.completions` returning deterministic replies."""
+
+    def __init__(self, reply_tokens: int, token_delay: float):
+        self.reply_tokens = reply_tokens
+        self.token_delay = token_delay
+
+    async def create(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        # Seed from the last message so the same input always gets the same reply
+        seed = int.from_bytes(hashlib.blake2b(messages[-1]["content"].encode(), digest_size=4).digest(), "big")
+        words = [_WORDS[(seed + i) % len(_WORDS)] for i in range(self.reply_tokens)]
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(words),
+            total_tokens=prompt_tokens + len(words),
+        )
+
+        if not stream:
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay * len(words))
+            message = SimpleNamespace(content=" ".join(words))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+        def chunks() -> Iterator[SimpleNamespace]:
+            for i, word in enumerate(words):
+                delta = SimpleNamespace(content=word if i == 0 else " " + word)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None, x_groq=None)
+            yield SimpleNamespace(choices=[], usage=None, x_groq=SimpleNamespace(usage=usage))
+
+        return _StubStream(chunks(), self.token_delay)
+
+
+class StubLLMClient:
+    """
+    Offline stand-in for the Groq client used for benchmarks and profiling.
+
+    Replies are deterministic for a given message and no network calls are made.
+    """
+
+    def __init__(self, reply_tokens: int = 40, token_delay: float = 0.0):
+        """
+        Initialize the stub client.
+
+        Args:
+            reply_tokens: Number of words in every reply
+            token_delay: Seconds to wait per generated word, to mimic generation latency
+        """
+        self.chat = SimpleNamespace(completions=_StubCompletions(reply_tokens, token_delay))
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from typing import Optional, Dict, List, Iterable, Iterator, AsyncIterator, Any, Tuple, Union
+
+from mindease.db.repository import ConversationRepository
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_ROLES = ("user", "assistant")
+
+# Optional text columns of each record type, stored as given
+STRING_OR_NULL_FIELDS = {
+    "conversation": ("created_at", "updated_at", "crisis_flagged_at"),
+    "message": ("prompt_version", "created_at"),
+}
+
+
+class TransferService:
+    """Service for bulk export and import of conversation history as NDJSON."""
+
+    def __init__(self):
+        """Initialize the transfer service."""
+        self.repository = ConversationRepository()
+
+    def export_ndjson(self, user_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Stream conversation history as NDJSON.
+
+        Args:
+            user_id: Optional user ID to restrict the export to (all users if None)
+
+        Yields:
+            UTF-8 encoded NDJSON, one chunk of lines per batch of records
+        """
+        for record_type in ("conversation", "message"):
+            after_id: Optional[int] = 0
+            while after_id is not None:
+                batch = self.repository.get_export_batch(record_type, user_id, after_id)
+                if batch["records"]:
+                    yield self._encode(batch["records"])
+                after_id = batch["next_after"]
+
+    async def export_ndjson_async(self, user_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Stream conversation history as NDJSON without blocking the event loop.
+
+        Same output as export_ndjson; each batch is read in a worker thread.
+
+        Args:
+            user_id: Optional user ID to restrict the export to (all users if None)
+
+        Yields:
+            UTF-8 encoded NDJSON, one chunk of lines per batch of records
+        """
+        for record_type in ("conversation", "message"):
+            after_id: Optional[int] = 0
+            while after_id is not None:
+                batch = await asyncio.to_thread(
+                    self.repository.get_export_batch, record_type, user_id, after_id
+                )
+                if batch["records"]:
+                    yield self._encode(batch["records"])
+                after_id = batch["next_after"]
+
+    @staticmethod
+    def _encode(records: List[Dict[str, Any]]) -> bytes:
+        """Encode records as NDJSON lines."""
+        return "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records
+        ).encode()
+
+    def import_ndjson(
+        self, lines: Iterable[Union[str, bytes]], batch_size: int = 5000
+    ) -> Dict[str, int]:
+        """
+        Import conversation history from NDJSON lines.
+
+        Args:
+            lines: Iterable of NDJSON lines (e.g. an open file)
+            batch_size: Number of rows per batched insert
+
+        Returns:
+            Dictionary with 'conversations' and 'messages' counts of rows inserted
+
+        Raises:
+            ValueError: If a line is not valid JSON or not a valid record
+        """
+        return self.repository.bulk_import(self._parse_lines(lines), batch_size=batch_size)
+
+    @staticmethod
+    def _parse_lines(lines: Iterable[Union[str, bytes]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Decode and validate NDJSON lines lazily, yielding (line number, record) and skipping blank ones."""
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected a JSON object on line {line_number}")
+            error = TransferService._validate_record(record)
+            if error is not None:
+                raise ValueError(f"Invalid record on line {line_number}: {error}")
+            yield line_number, record
+
+    @staticmethod
+    def _validate_record(record: Dict[str, Any]) -> Optional[str]:
+        """Check a record against the export format, returning what is wrong with it if anything."""
+        record_type = record.get("type")
+        if record_type not in ("conversation", "message"):
+            return f"unknown record type {record_type!r}"
+        for field in ("conversation_id", "user_id"):
+            if not isinstance(record.get(field), str):
+                return f"'{field}' must be a string"
+        for field in STRING_OR_NULL_FIELDS[record_type]:
+            value = record.get(field)
+            if value is not None and not isinstance(value, str):
+                return f"'{field}' must be a string or null"
+        if record_type == "message":
+            if record.get("role") not in MESSAGE_ROLES:
+                return f"'role' must be one of {', '.join(MESSAGE_ROLES)}"
+            if not isinstance(record.get("content"), str):
+                return "'content' must be a string"
+            for field in ("tokens_used", "latency_ms"):
+                value = record.get(field)
+                if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                    return f"'{field}' must be an integer or null"
+        return None
+
+
+# Global transfer service instance
+transfer_service = TransferService()
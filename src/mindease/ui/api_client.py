@@ -0,0 +1,97 @@
+import json
+import logging
+from typing import Optional, Dict, Any, AsyncIterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class MindEaseAPIClient:
+    """Async client for the MindEase HTTP API using a pooled keep-alive connection set."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_token: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = 60.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Base URL of the MindEase API (e.g. http://localhost:8000)
+            api_token: The API's API_TOKEN, required to read conversation history
+            max_connections: Maximum number of concurrent connections to the API
+            max_keepalive_connections: Maximum number of idle connections kept open
+            timeout: Seconds to wait for the API before giving up on a request
+        """
+        headers = {"Authorization": f"Bearer {api_token}"} if api_token else None
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+        )
+
+    async def stream_chat(
+        self, user_message: str, user_id: str, conversation_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Send a message through the streaming chat endpoint.
+
+        Args:
+            user_message: The user's message
+            user_id: Unique user identifier
+            conversation_id: Optional conversation ID for multi-turn chat
+
+        Yields:
+            Stream events ('start', 'token' and 'end')
+
+        Raises:
+            ValueError: If the API reports an error
+        """
+        payload = {"user_id": user_id, "content": user_message, "conversation_id": conversation_id}
+        async with self.client.stream("POST", "/v1/chat/stream", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise ValueError(f"Chat request failed with status {response.status_code}: {response.text}")
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "error":
+                    raise ValueError(event["detail"])
+                yield event
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        user_id: str,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a page of conversation history, newest page first.
+
+        Returns:
+            Dictionary with 'messages' and 'next_before' keys, or None if the
+            conversation does not exist
+        """
+        params: Dict[str, Any] = {"user_id": user_id, "limit": limit}
+        if before is not None:
+            params["before"] = before
+        response = await self.client.get(f"/v1/conversations/{conversation_id}/messages", params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self.client.aclose()
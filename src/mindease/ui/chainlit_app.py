@@ -1,25 +1,154 @@
+import os
 import uuid
+from typing import Optional, Dict, Any, AsyncIterator
+from urllib.parse import urlparse, parse_qs
+
 import chainlit as cl
-from mindease.services.chat_service import chat_service
+
+# When set, the UI talks to the MindEase API over HTTP instead of calling the
+# chat service in-process, so the UI and API tiers can be scaled separately.
+API_URL = os.getenv("MINDEASE_API_URL")
+# The API's API_TOKEN, needed to load history when resuming a conversation
+API_TOKEN = os.getenv("MINDEASE_API_TOKEN")
+
+# Number of messages loaded per page when resuming a conversation
+HISTORY_PAGE_SIZE = 20
+
+WELCOME_MESSAGE = (
+    "👋 Hi! I'm MindEase, your supportive AI companion. "
+    "I'm here to help you navigate academic stress and support your emotional well-being. "
+    "\n\nFeel free to share what's on your mind—whether it's exam anxiety, time management struggles, "
+    "or just needing someone to talk to. I'm listening and I'm here to support you. 💙"
+)
+
+
+class _LocalBackend:
+    """Calls the chat service in-process, with the same interface as MindEaseAPIClient."""
+
+    def __init__(self):
+        from mindease.services.chat_service import chat_service
+
+        self.chat_service = chat_service
+
+    def stream_chat(
+        self, user_message: str, user_id: str, conversation_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        return self.chat_service.chat_stream(user_message, user_id, conversation_id)
+
+    async def get_messages(
+        self,
+        conversation_id: str,
+        user_id: str,
+        before: Optional[int] = None,
+        limit: int = 50,
+    ) -> Optional[Dict[str, Any]]:
+        return self.chat_service.get_messages_page(conversation_id, user_id, before, limit)
+
+
+if API_URL:
+    from mindease.ui.api_client import MindEaseAPIClient
+
+    # One pooled client per UI process, shared by all sessions
+    backend = MindEaseAPIClient(API_URL, api_token=API_TOKEN)
+else:
+    backend = _LocalBackend()
+
+
+@cl.on_app_shutdown
+async def on_app_shutdown():
+    """Close the API client's pooled connections when the UI process stops."""
+    if API_URL:
+        await backend.close()
+
+
+def _url_params() -> Dict[str, str]:
+    """Query parameters of the page that opened the session (e.g. ?conversation_id=...)."""
+    referer = cl.context.session.environ.get("HTTP_REFERER", "")
+    return {key: values[0] for key, values in parse_qs(urlparse(referer).query).items()}
+
+
+def _user_id() -> str:
+    """Identify the user from Chainlit auth, or give the session a random demo ID."""
+    user = cl.user_session.get("user")
+    if user is not None:
+        return user.identifier
+    # Never trust an identity from the page URL: anyone could load another
+    # user's history by editing it. In production, enable Chainlit auth.
+    return str(uuid.uuid4())
+
+
+async def _send_history_page(before: Optional[int] = None) -> bool:
+    """
+    Render a page of the current conversation's stored history.
+
+    Returns:
+        False if the conversation does not exist for the session's user
+    """
+    page = await backend.get_messages(
+        cl.user_session.get("conversation_id"),
+        cl.user_session.get("user_id"),
+        before=before,
+        limit=HISTORY_PAGE_SIZE,
+    )
+    if page is None:
+        return False
+    if not page["messages"]:
+        return True
+
+    if before is None:
+        for message in page["messages"]:
+            message_type = "user_message" if message["role"] == "user" else "assistant_message"
+            await cl.Message(content=message["content"], type=message_type).send()
+    else:
+        # Chainlit can only append, so earlier messages are shown as one transcript
+        transcript = "\n\n".join(
+            f"**{'You' if m['role'] == 'user' else 'MindEase'}:** {m['content']}"
+            for m in page["messages"]
+        )
+        await cl.Message(content=f"Earlier messages:\n\n{transcript}").send()
+
+    if page["next_before"] is not None:
+        await cl.Message(
+            content="",
+            actions=[
+                cl.Action(
+                    name="load_earlier",
+                    payload={"before": page["next_before"]},
+                    label="Load earlier messages",
+                )
+            ],
+        ).send()
+    return True
 
 
 @cl.on_chat_start
 async def on_chat_start():
-    """Initialize chat session."""
-    # Generate demo user_id and conversation_id for testing
-    # In production, these would come from the frontend/auth system (backend service calls)
-    user_id = str(uuid.uuid4())
-    conversation_id = str(uuid.uuid4())
+    """Initialize chat session, resuming the user's conversation given in the page URL if any."""
+    requested = _url_params().get("conversation_id")
+    cl.user_session.set("user_id", _user_id())
+    cl.user_session.set("conversation_id", requested)
+
+    # Only resume conversations that belong to the session's own user
+    if requested and await _send_history_page():
+        return
+
+    # Reusing the Chainlit thread ID lets on_chat_resume find the conversation again
+    cl.user_session.set("conversation_id", cl.context.session.thread_id)
+    await cl.Message(content=WELCOME_MESSAGE).send()
+
 
-    cl.user_session.set("user_id", user_id)
-    cl.user_session.set("conversation_id", conversation_id)
+@cl.on_chat_resume
+async def on_chat_resume(thread: Dict[str, Any]):
+    """Resume a conversation from Chainlit's thread history (requires a data layer)."""
+    cl.user_session.set("user_id", thread.get("userIdentifier") or _user_id())
+    cl.user_session.set("conversation_id", thread["id"])
 
-    await cl.Message(
-        content="👋 Hi! I'm MindEase, your supportive AI companion. "
-        "I'm here to help you navigate academic stress and support your emotional well-being. "
-        "\n\nFeel free to share what's on your mind—whether it's exam anxiety, time management struggles, "
-        "or just needing someone to talk to. I'm listening and I'm here to support you. 💙"
-    ).send()
+
+@cl.action_callback("load_earlier")
+async def on_load_earlier(action: cl.Action):
+    """Load the previous page of conversation history."""
+    await action.remove()
+    await _send_history_page(before=action.payload["before"])
 
 
 @cl.on_message
@@ -34,22 +163,13 @@ async def on_message(message: cl.Message):
     await msg.send()
 
     try:
-        # Get response from chat service
-        response = await chat_service.chat(
-            user_message=user_message,
-            user_id=user_id,
-            conversation_id=conversation_id,
-        )
-
-        # Get user conversation ID from response (if available)
-        updated_conversation_id = response.get("conversation_id", "")
-
-        # Update conversation ID if new
-        if updated_conversation_id != conversation_id:
-            cl.user_session.set("conversation_id", updated_conversation_id)
+        async for event in backend.stream_chat(user_message, user_id, conversation_id):
+            if event["type"] == "token":
+                await msg.stream_token(event["content"])
+            elif event["type"] == "start" and event["conversation_id"] != conversation_id:
+                # Update conversation ID if new
+                cl.user_session.set("conversation_id", event["conversation_id"])
 
-        # Update message with response
-        msg.content = response.get("message")
         await msg.update()
 
     except Exception as e: